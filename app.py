@@ -1,9 +1,16 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, g, render_template, request, jsonify, session, redirect, stream_with_context, url_for
+from flask.json.provider import DefaultJSONProvider
 from functools import wraps
+from itertools import chain
+from typing import Iterable, Iterator
+import atexit
+import logging
+import orjson
 import stripe
 import os
 from dotenv import load_dotenv
 from repositories.db import init_pool
+from repositories.subscription_repository import SubscriptionRepository
 from repositories.user_repository import UserRepository
 from services.stripe_service import StripeService
 from services.auth_service import AuthService
@@ -11,15 +18,36 @@ from services.models import Currency, RecurringInterval
 
 load_dotenv()
 
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper())
+logger = logging.getLogger(__name__)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson instead of the stdlib json module.
+
+    Used by jsonify(), request.get_json() and app.json; types orjson does
+    not handle natively (e.g. Decimal) fall back to Flask's default hook.
+    """
+
+    def _options(self) -> int:
+        return orjson.OPT_SORT_KEYS if self.sort_keys else 0
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
 
-stripe_service = StripeService(
-    secret_key=os.getenv('STRIPE_SECRET_KEY'),
-    publishable_key=os.getenv('STRIPE_PUBLISHABLE_KEY'),
-    webhook_secret=os.getenv('STRIPE_WEBHOOK_SECRET'),
-)
-
 # ------------------------------------------------------------------ #
 # Database & Auth                                                      #
 # ------------------------------------------------------------------ #
@@ -27,7 +55,17 @@ stripe_service = StripeService(
 init_pool()  # reads DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME from .env
 
 user_repository = UserRepository()
+subscription_repository = SubscriptionRepository()
 auth_service = AuthService(user_repository)
+AuthService.configure_cost()  # BCRYPT_COST from .env
+
+stripe_service = StripeService(
+    secret_key=os.getenv('STRIPE_SECRET_KEY'),
+    publishable_key=os.getenv('STRIPE_PUBLISHABLE_KEY'),
+    webhook_secret=os.getenv('STRIPE_WEBHOOK_SECRET'),
+    subscription_repository=subscription_repository,
+)
+atexit.register(stripe_service.close)
 
 
 
@@ -37,13 +75,34 @@ auth_service = AuthService(user_repository)
 # ================================================================== #
 
 def login_required(f):
+    """Redirect anonymous users to /login; expose the signed-in email as ``g.user_email``."""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_email' not in session:
+        email = session.get('user_email')
+        if not email:
             return redirect(url_for('login'))
+        g.user_email = email
         return f(*args, **kwargs)
     return decorated_function
 
+# ================================================================== #
+# Streaming JSON                                                       #
+# ================================================================== #
+
+def _json_stream(head: dict, subscriptions: Iterable[dict]) -> Iterator[str]:
+    """Yield ``head`` as a JSON object with the subscriptions streamed into it.
+
+    Items are serialised as the iterator yields them, so the response starts
+    once the first Stripe page is in rather than the last; ``count`` is
+    emitted at the end.
+    """
+    yield app.json.dumps(head)[:-1] + ', "subscriptions": ['
+    count = 0
+    for sub in subscriptions:
+        yield (',' if count else '') + app.json.dumps(sub)
+        count += 1
+    yield f'], "count": {count}}}'
+
 # ================================================================== #
 # Routes                                                               #
 # ================================================================== #
@@ -51,14 +110,27 @@ def login_required(f):
 @app.route('/')
 @login_required
 def index():
-    user_email = session.get('user_email')
-    subscriptions, queried_customer_ids = stripe_service.get_subscriptions_for_user(user_email, full=False)
+    user_email = g.user_email
+
+    # Served from the local index kept current by the webhooks. Hit Stripe
+    # only on an explicit ?refresh=1 or when the email has never been synced
+    # (e.g. first login after the index was added), and backfill.
+    refresh = bool(request.args.get('refresh'))
+    rows = None if refresh else subscription_repository.find_active_by_email(user_email)
+    if rows is not None:
+        subscriptions = [row.to_summary() for row in rows]
+    else:
+        subscriptions, queried_customer_ids = stripe_service.get_subscriptions_for_user(
+            user_email, full=False, fresh=refresh,
+        )
+        stripe_service.store_subscriptions(user_email, subscriptions)
+        logger.debug('Queried customer IDs for %s: %s', user_email, queried_customer_ids)
 
-    ids = [s.get('id') if isinstance(s, dict) else None for s in subscriptions]
-    print(f'Queried customer IDs for {user_email}: {queried_customer_ids}')
-    print(f'Fetched {len(subscriptions)} subscriptions for {user_email}: {ids}')
-    for sub in subscriptions:
-        print(f"Subscription {sub.get('id')}: status={sub.get('status')}")
+    if logger.isEnabledFor(logging.DEBUG):
+        ids = [s.get('id') if isinstance(s, dict) else None for s in subscriptions]
+        logger.debug('Fetched %d subscriptions for %s: %s', len(subscriptions), user_email, ids)
+        for sub in subscriptions:
+            logger.debug('Subscription %s: status=%s', sub.get('id'), sub.get('status'))
 
     return render_template(
         'index.html',
@@ -78,15 +150,35 @@ def download_invoice(invoice_id):
 @app.route('/api/subscriptions')
 @login_required
 def api_subscriptions():
-    """Return subscriptions JSON for the currently logged-in user (debug endpoint)."""
-    user_email = session.get('user_email')
-    subscriptions, queried_customer_ids = stripe_service.get_subscriptions_for_user(user_email, full=True)
-    return jsonify({
-        'user_email': user_email,
-        'count': len(subscriptions),
-        'queried_customer_ids': queried_customer_ids,
-        'subscriptions': subscriptions,
-    })
+    """Return subscriptions JSON for the currently logged-in user (debug endpoint).
+
+    Lists active subscriptions only; pass ``?all=1`` for the full history.
+    """
+    user_email = g.user_email
+    queried_customer_ids = []
+    subscriptions = stripe_service.iter_subscriptions_for_user(
+        user_email,
+        full=True,
+        include_all=bool(request.args.get('all')),
+        queried_customer_ids=queried_customer_ids,
+        fresh=True,
+    )
+    # Run the customer lookup and first fetch before the 200 goes out, so
+    # a Stripe failure there is a proper error response rather than a
+    # truncated JSON body.
+    try:
+        first = next(subscriptions, None)
+    except stripe.error.StripeError as exc:
+        return jsonify({'error': str(exc)}), 502
+    if first is not None:
+        subscriptions = chain((first,), subscriptions)
+
+    # The lookup above has filled in the customer ids, if any were queried.
+    head = {'user_email': user_email, 'queried_customer_ids': queried_customer_ids}
+    return Response(
+        stream_with_context(_json_stream(head, subscriptions)),
+        mimetype='application/json',
+    )
 
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -141,7 +233,6 @@ def create_checkout_session():
     try:
         raw_currency = data.get('currency', 'usd')
         raw_interval = data.get('recurring')
-
         result = stripe_service.create_checkout_session(
             email=data.get('email'),
             product_name=data.get('productName', 'Default Product'),
@@ -155,7 +246,7 @@ def create_checkout_session():
         return jsonify({'error': str(exc)}), 400
     except stripe.error.StripeError as exc:
         return jsonify({'error': str(exc)}), 502
-    print(jsonify(result))
+    logger.debug('Checkout session result: %s', result)
     return jsonify(result)
 
 
@@ -169,7 +260,17 @@ def logout():
 @login_required
 def success():
     session_id = request.args.get('session_id')
-    details = stripe_service.get_checkout_session_details(session_id) if session_id else {}
+    amount = request.args.get('amount', type=float)
+    try:
+        currency = Currency(request.args.get('currency', '').lower())
+    except ValueError:
+        currency = None
+
+    if amount is not None and currency is not None:
+        details = {'amount': amount, 'currency': currency.value.upper()}
+    else:
+        # Links from before the amount was added to the success URL.
+        details = stripe_service.get_checkout_session_details(session_id) if session_id else {}
     return render_template(
         'success.html',
         session_id=session_id,
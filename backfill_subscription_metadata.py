@@ -0,0 +1,38 @@
+"""
+Backfill script — tags existing Stripe subscriptions with `user_email` metadata.
+
+Subscriptions created before checkout started stamping this metadata are
+invisible to the metadata search used by the dashboard. Run once after
+deploying; already-tagged subscriptions are skipped, so re-runs are safe.
+
+Usage:
+    python backfill_subscription_metadata.py
+
+Reads STRIPE_SECRET_KEY and STRIPE_PUBLISHABLE_KEY from .env.
+"""
+
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Ensure project root is on the path so `repositories` / `services` resolve.
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.stripe_service import StripeService
+
+
+def main():
+    service = StripeService(
+        secret_key=os.getenv('STRIPE_SECRET_KEY'),
+        publishable_key=os.getenv('STRIPE_PUBLISHABLE_KEY'),
+    )
+
+    updated = service.backfill_subscription_metadata()
+    print(f'Tagged {updated} subscription(s) with user_email metadata.')
+
+
+if __name__ == '__main__':
+    main()
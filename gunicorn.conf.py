@@ -0,0 +1,24 @@
+"""
+Gunicorn settings for serving the Flask app.
+
+Usage:
+    gunicorn app:app
+
+Most request time is spent waiting on Stripe over HTTPS, so each worker
+runs a pool of threads: a request blocked on Stripe I/O only holds one
+thread instead of a whole worker process.
+"""
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:9001')
+# Each worker opens its whole MySQL pool at startup: one connection per
+# thread (GUNICORN_THREADS, or DB_POOL_SIZE), at most 32, so more than 32
+# threads can exhaust the pool under load. Keep workers x pool size under
+# the server's max_connections (151 by default), leaving room for other
+# clients; the defaults use 2 x 16 = 32.
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+timeout = 60
+keepalive = 5
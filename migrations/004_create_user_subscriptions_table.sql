@@ -0,0 +1,24 @@
+-- ============================================================
+-- Migration: Create the `user_subscriptions` table
+-- Database:  stripepoc  (MySQL 8+)
+--
+-- Local index of Stripe subscriptions, kept in sync by the webhook
+-- handlers so the dashboard can render without calling Stripe.
+-- ============================================================
+
+USE stripepoc;
+
+CREATE TABLE IF NOT EXISTS user_subscriptions (
+    subscription_id     VARCHAR(255)   NOT NULL PRIMARY KEY,
+    user_email          VARCHAR(255)   NOT NULL,
+    status              VARCHAR(32)    NOT NULL,
+    current_period_end  DATETIME       NULL,
+    product_name        VARCHAR(255)   NULL,
+    amount              DECIMAL(12, 2) NULL,
+    currency            VARCHAR(3)     NULL,
+    recurring_interval  VARCHAR(8)     NULL,
+    created_at          DATETIME       NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at          DATETIME       NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    INDEX ix_user_subscriptions_email (user_email)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
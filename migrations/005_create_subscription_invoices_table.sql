@@ -0,0 +1,23 @@
+-- ============================================================
+-- Migration: Create the `subscription_invoices` table
+-- Database:  stripepoc  (MySQL 8+)
+--
+-- Invoices of the subscriptions in `user_subscriptions`, so the
+-- dashboard can list them (and their PDFs) without calling Stripe.
+-- Filled on a Stripe refresh and by the invoice.* webhooks.
+-- ============================================================
+
+USE stripepoc;
+
+CREATE TABLE IF NOT EXISTS subscription_invoices (
+    invoice_id          VARCHAR(255)   NOT NULL PRIMARY KEY,
+    subscription_id     VARCHAR(255)   NOT NULL,
+    status              VARCHAR(32)    NULL,
+    amount_paid         BIGINT         NULL,      -- minor units, as Stripe reports it
+    currency            VARCHAR(3)     NULL,
+    pdf_url             TEXT           NULL,
+    created             BIGINT         NULL,      -- Stripe's Unix timestamp
+    updated_at          DATETIME       NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    INDEX ix_subscription_invoices_subscription (subscription_id, created)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
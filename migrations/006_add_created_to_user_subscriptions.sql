@@ -0,0 +1,13 @@
+-- ============================================================
+-- Migration: Add Stripe's creation time to `user_subscriptions`
+-- Database:  stripepoc  (MySQL 8+)
+--
+-- Lets the dashboard list indexed subscriptions newest first, in
+-- the same order as Stripe's list endpoint.
+-- ============================================================
+
+USE stripepoc;
+
+ALTER TABLE user_subscriptions
+    ADD COLUMN created  BIGINT NULL AFTER recurring_interval,  -- Stripe's Unix timestamp
+    ADD INDEX ix_user_subscriptions_email_status_created (user_email, status, created);
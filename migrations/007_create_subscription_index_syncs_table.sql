@@ -0,0 +1,16 @@
+-- ============================================================
+-- Migration: Create the `subscription_index_syncs` table
+-- Database:  stripepoc  (MySQL 8+)
+--
+-- One row per email whose subscriptions have been synced from
+-- Stripe into `user_subscriptions`. From then on the webhooks keep
+-- the index current, so the dashboard trusts it even when it holds
+-- no active subscriptions for that email.
+-- ============================================================
+
+USE stripepoc;
+
+CREATE TABLE IF NOT EXISTS subscription_index_syncs (
+    user_email          VARCHAR(255)   NOT NULL PRIMARY KEY,
+    synced_at           DATETIME       NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -3,12 +3,16 @@ Database connection pool for MySQL.
 
 Framework-agnostic — uses mysql-connector-python's built-in pooling so
 the same module works in Flask, FastAPI, Django, or plain scripts.
+The driver uses its C extension (bundled with the binary wheels) by
+default, so protocol parsing and row decoding don't run in pure Python;
+installs without it fall back to the pure-Python protocol.
 """
 
 from __future__ import annotations
 
 import os
 from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Generator
 
 import mysql.connector
@@ -17,6 +21,11 @@ from mysql.connector import pooling
 
 _pool: pooling.MySQLConnectionPool | None = None
 
+# Connection borrowed by the active unit_of_work() block, if any.
+_current_conn: ContextVar[mysql.connector.MySQLConnection | None] = ContextVar(
+    'stripepoc_current_conn', default=None,
+)
+
 
 def init_pool(
     host: str | None = None,
@@ -24,18 +33,29 @@ def init_pool(
     user: str | None = None,
     password: str | None = None,
     database: str | None = None,
-    pool_size: int = 5,
+    pool_size: int | None = None,
 ) -> pooling.MySQLConnectionPool:
     """Initialise (or re-initialise) the global connection pool.
 
     Parameters fall back to environment variables when not supplied:
-        DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+        DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME, DB_POOL_SIZE
+
+    The pool does not wait for a free connection (it raises PoolError when
+    exhausted), so it defaults to one connection per request thread
+    (GUNICORN_THREADS). Sizes above mysql-connector's limit of 32 are
+    clamped to it. All connections are opened here, so every process
+    holds ``pool_size`` of the server's ``max_connections``.
     """
     global _pool
 
+    if pool_size is None:
+        pool_size = int(os.getenv('DB_POOL_SIZE', os.getenv('GUNICORN_THREADS', '16')))
     _pool = pooling.MySQLConnectionPool(
         pool_name='stripepoc_pool',
-        pool_size=pool_size,
+        pool_size=min(pool_size, pooling.CNX_POOL_MAXSIZE),
+        # Autocommit is off, so read-only requests leave a transaction (and
+        # its REPEATABLE READ snapshot) open; the reset on return to the pool
+        # rolls it back so the next borrower sees fresh commits.
         pool_reset_session=True,
         host=host or os.getenv('DB_HOST', 'localhost'),
         port=port or int(os.getenv('DB_PORT', '3306')),
@@ -56,9 +76,38 @@ def get_pool() -> pooling.MySQLConnectionPool:
 
 @contextmanager
 def get_connection() -> Generator[mysql.connector.MySQLConnection, None, None]:
-    """Yield a connection from the pool; returns it automatically on exit."""
+    """Yield a connection from the pool; returns it automatically on exit.
+
+    Inside a ``unit_of_work()`` block the unit's connection is reused.
+    """
+    shared = _current_conn.get()
+    if shared is not None:
+        yield shared
+        return
+
     conn = get_pool().get_connection()
     try:
         yield conn
     finally:
         conn.close()  # returns to pool
+
+
+@contextmanager
+def unit_of_work() -> Generator[mysql.connector.MySQLConnection, None, None]:
+    """Run several queries on one pooled connection.
+
+    Every ``get_connection()`` inside the block shares the same connection,
+    so a request pays for one pool checkout instead of one per query.
+    Nested blocks join the outer unit.
+    """
+    shared = _current_conn.get()
+    if shared is not None:
+        yield shared
+        return
+
+    with get_connection() as conn:
+        token = _current_conn.set(conn)
+        try:
+            yield conn
+        finally:
+            _current_conn.reset(token)
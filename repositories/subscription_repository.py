@@ -0,0 +1,247 @@
+"""
+SubscriptionRepository — data-access layer for the `user_subscriptions` table.
+
+Stores a denormalised copy of each user's Stripe subscriptions (and
+their invoices, in `subscription_invoices`) so pages can be rendered from
+MySQL instead of the Stripe API. The rows are kept current by the Stripe
+webhook handlers; `subscription_index_syncs` records which emails have
+been synced from Stripe at least once.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from repositories.db import get_connection
+
+
+# Column list shared by all SELECT queries so we don't repeat ourselves.
+_SUBSCRIPTION_COLUMNS = (
+    'subscription_id, user_email, status, current_period_end, product_name, '
+    'amount, currency, recurring_interval, created, created_at, updated_at'
+)
+_INVOICE_COLUMNS = 'invoice_id, subscription_id, status, amount_paid, currency, pdf_url, created'
+
+# Match what StripeService lists: active subscriptions only, at most 25,
+# each with its 10 most recent invoices.
+_ACTIVE_SUBSCRIPTION_CAP = 25
+_INVOICES_PER_SUBSCRIPTION = 10
+
+
+@dataclass
+class InvoiceRow:
+    """Represents a single row from the `subscription_invoices` table."""
+    invoice_id: str
+    subscription_id: str
+    status: Optional[str]
+    amount_paid: Optional[int]
+    currency: Optional[str]
+    pdf_url: Optional[str]
+    created: Optional[int]
+
+    def to_summary(self) -> dict:
+        """Return the same shape as StripeService's invoice summaries."""
+        return {
+            'id': self.invoice_id,
+            'status': self.status,
+            'amount_paid': self.amount_paid,
+            'currency': self.currency,
+            'pdf_url': self.pdf_url,
+            'created': self.created,
+        }
+
+
+@dataclass
+class SubscriptionRow:
+    """Represents a single row from the `user_subscriptions` table."""
+    subscription_id: str
+    user_email: str
+    status: str
+    current_period_end: Optional[datetime]
+    product_name: Optional[str]
+    amount: Optional[Decimal]
+    currency: Optional[str]
+    recurring_interval: Optional[str]
+    created: Optional[int]
+    created_at: datetime
+    updated_at: datetime
+    invoices: list[InvoiceRow] = field(default_factory=list)
+
+    def to_summary(self) -> dict:
+        """Return the same shape as StripeService's subscription summaries."""
+        return {
+            'id': self.subscription_id,
+            'status': self.status,
+            'current_period_end': self.current_period_end.isoformat() if self.current_period_end else None,
+            'product_name': self.product_name,
+            'amount': float(self.amount) if self.amount is not None else None,
+            'currency': self.currency,
+            'interval': self.recurring_interval,
+            'created': self.created,
+            'can_cancel': self.status in ['active', 'trialing'],
+            'invoices': [inv.to_summary() for inv in self.invoices],
+        }
+
+
+class SubscriptionRepository:
+    """Read/write operations for the ``user_subscriptions`` table."""
+
+    # ------------------------------------------------------------------ #
+    # Reads                                                                #
+    # ------------------------------------------------------------------ #
+
+    def find_active_by_email(self, email: str) -> list[SubscriptionRow] | None:
+        """Return the email's active subscriptions, newest first, with their invoices.
+
+        The same set StripeService lists by default: the 25 most recently
+        created subscriptions, each with its 10 most recent invoices.
+        Returns None if the email has never been synced from Stripe, so an
+        empty list means the user has no active subscriptions.
+        """
+        sql = (
+            f'SELECT {_SUBSCRIPTION_COLUMNS} FROM user_subscriptions '
+            "WHERE user_email = %s AND status = 'active' "
+            f'ORDER BY created DESC, created_at DESC LIMIT {_ACTIVE_SUBSCRIPTION_CAP}'
+        )
+        with get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute('SELECT 1 FROM subscription_index_syncs WHERE user_email = %s', (email,))
+            if cursor.fetchone() is None:
+                cursor.close()
+                return None
+            cursor.execute(sql, (email,))
+            rows = cursor.fetchall()
+            invoice_rows = []
+            if rows:
+                placeholders = ', '.join(['%s'] * len(rows))
+                cursor.execute(
+                    f'SELECT {_INVOICE_COLUMNS} FROM subscription_invoices '
+                    f'WHERE subscription_id IN ({placeholders}) ORDER BY created DESC',
+                    tuple(row['subscription_id'] for row in rows),
+                )
+                invoice_rows = cursor.fetchall()
+            cursor.close()
+
+        subscriptions = {row['subscription_id']: SubscriptionRow(**row) for row in rows}
+        for row in invoice_rows:
+            invoices = subscriptions[row['subscription_id']].invoices
+            if len(invoices) < _INVOICES_PER_SUBSCRIPTION:
+                invoices.append(InvoiceRow(**row))
+        return list(subscriptions.values())
+
+    def find_active_ids_by_email(self, email: str) -> set[str]:
+        """Return the ids of every subscription stored as active for the email."""
+        sql = "SELECT subscription_id FROM user_subscriptions WHERE user_email = %s AND status = 'active'"
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (email,))
+            ids = {row[0] for row in cursor.fetchall()}
+            cursor.close()
+        return ids
+
+    # ------------------------------------------------------------------ #
+    # Writes                                                               #
+    # ------------------------------------------------------------------ #
+
+    def upsert(
+        self,
+        user_email: str,
+        subscription_id: str,
+        status: str,
+        current_period_end: datetime | None,
+        product_name: str | None,
+        amount: float | Decimal | None,
+        currency: str | None,
+        interval: str | None,
+        created: int | None = None,
+    ) -> None:
+        """Insert a subscription, or overwrite the stored copy if it already exists."""
+        sql = (
+            'INSERT INTO user_subscriptions '
+            '(subscription_id, user_email, status, current_period_end, product_name, '
+            'amount, currency, recurring_interval, created) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) '
+            'ON DUPLICATE KEY UPDATE '
+            'user_email = VALUES(user_email), status = VALUES(status), '
+            'current_period_end = VALUES(current_period_end), '
+            'product_name = VALUES(product_name), amount = VALUES(amount), '
+            'currency = VALUES(currency), recurring_interval = VALUES(recurring_interval), '
+            'created = COALESCE(VALUES(created), created)'
+        )
+        params = (
+            subscription_id, user_email, status, current_period_end,
+            product_name, amount, currency, interval, created,
+        )
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            conn.commit()
+            cursor.close()
+
+    def update_status(
+        self,
+        subscription_id: str,
+        status: str,
+        current_period_end: datetime | None = None,
+    ) -> bool:
+        """Update the status (and optionally period end) of a stored subscription.
+
+        Returns True if a row was changed.
+        """
+        sql = (
+            'UPDATE user_subscriptions SET status = %s, '
+            'current_period_end = COALESCE(%s, current_period_end) '
+            'WHERE subscription_id = %s'
+        )
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (status, current_period_end, subscription_id))
+            conn.commit()
+            affected = cursor.rowcount
+            cursor.close()
+        return affected > 0
+
+    def upsert_invoices(self, subscription_id: str, invoices: list[dict]) -> None:
+        """Insert or overwrite invoices of a subscription.
+
+        ``invoices`` are invoice summaries as StripeService builds them
+        (keys: id, status, amount_paid, currency, pdf_url, created).
+        """
+        if not invoices:
+            return
+        sql = (
+            'INSERT INTO subscription_invoices '
+            '(invoice_id, subscription_id, status, amount_paid, currency, pdf_url, created) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s) '
+            'ON DUPLICATE KEY UPDATE '
+            'subscription_id = VALUES(subscription_id), status = VALUES(status), '
+            'amount_paid = VALUES(amount_paid), currency = VALUES(currency), '
+            'pdf_url = VALUES(pdf_url), created = VALUES(created)'
+        )
+        params = [
+            (
+                inv['id'], subscription_id, inv.get('status'), inv.get('amount_paid'),
+                inv.get('currency'), inv.get('pdf_url'), inv.get('created'),
+            )
+            for inv in invoices
+        ]
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(sql, params)
+            conn.commit()
+            cursor.close()
+
+    def mark_synced(self, email: str) -> None:
+        """Record that the email's subscriptions have just been synced from Stripe."""
+        sql = (
+            'INSERT INTO subscription_index_syncs (user_email) VALUES (%s) '
+            'ON DUPLICATE KEY UPDATE synced_at = CURRENT_TIMESTAMP'
+        )
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (email,))
+            conn.commit()
+            cursor.close()
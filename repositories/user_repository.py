@@ -7,18 +7,20 @@ Uses parameterised queries to prevent SQL injection.
 
 from __future__ import annotations
 
+from contextlib import AbstractContextManager
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
-from repositories.db import get_connection
+from repositories.db import get_connection, unit_of_work
 
 
 # Column list shared by all SELECT queries so we don't repeat ourselves.
+# Order must match the UserRow fields: rows are unpacked positionally.
 _USER_COLUMNS = 'id, email, password_hash, created_at, updated_at'
 
 
-@dataclass
+@dataclass(slots=True)
 class UserRow:
     """Represents a single row from the `users` table."""
     id: int
@@ -31,6 +33,10 @@ class UserRow:
 class UserRepository:
     """CRUD operations for the ``users`` table."""
 
+    def unit_of_work(self) -> AbstractContextManager:
+        """Run the calls made inside the ``with`` block on a single connection."""
+        return unit_of_work()
+
     # ------------------------------------------------------------------ #
     # Reads                                                                #
     # ------------------------------------------------------------------ #
@@ -39,25 +45,25 @@ class UserRepository:
         """Return a UserRow for the given email, or None if not found."""
         sql = f'SELECT {_USER_COLUMNS} FROM users WHERE email = %s LIMIT 1'
         with get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
+            cursor = conn.cursor()
             cursor.execute(sql, (email,))
             row = cursor.fetchone()
             cursor.close()
         if row is None:
             return None
-        return UserRow(**row)
+        return UserRow(*row)
 
     def find_by_id(self, user_id: int) -> Optional[UserRow]:
         """Return a UserRow for the given ID, or None if not found."""
         sql = f'SELECT {_USER_COLUMNS} FROM users WHERE id = %s LIMIT 1'
         with get_connection() as conn:
-            cursor = conn.cursor(dictionary=True)
+            cursor = conn.cursor()
             cursor.execute(sql, (user_id,))
             row = cursor.fetchone()
             cursor.close()
         if row is None:
             return None
-        return UserRow(**row)
+        return UserRow(*row)
 
     def exists(self, email: str) -> bool:
         """Return True if a user with this email already exists."""
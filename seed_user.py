@@ -24,6 +24,7 @@ from repositories.user_repository import UserRepository
 
 def main():
     init_pool()
+    AuthService.configure_cost()
 
     auth = AuthService(UserRepository())
 
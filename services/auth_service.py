@@ -7,6 +7,16 @@ uses bcrypt for secure password hashing (adaptive cost factor).
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from enum import Enum
 
@@ -15,14 +25,39 @@ import bcrypt
 from repositories.user_repository import UserRepository, UserRow
 
 
+logger = logging.getLogger(__name__)
+
+# Bound once so hashing and checking skip the bcrypt module attribute lookup.
+# Each hash still draws its own fresh salt.
+_gensalt = bcrypt.gensalt
+_hashpw = bcrypt.hashpw
+_checkpw = bcrypt.checkpw
+
+# Cheap shape check (local@domain, RFC 5321 length limits, no whitespace or
+# control characters) so garbage input is rejected before any DB query or
+# bcrypt work. Real deliverability is not checked.
+_EMAIL_FAST_CHECK = re.compile(r'[^@\s\x00-\x1f\x7f]{1,64}@[^@\s\x00-\x1f\x7f]{1,255}').fullmatch
+
+
+def _make_dummy_hash(rounds: int) -> bytes:
+    """Return a genuine bcrypt hash of a random secret at the given cost.
+
+    Checking against it takes as long as checking a real user's password,
+    so unknown emails can't be told apart by response time. (A malformed
+    hash is rejected almost instantly.)
+    """
+    return _hashpw(secrets.token_hex(16).encode('utf-8'), _gensalt(rounds=rounds))
+
+
 class AuthError(str, Enum):
     """Machine-readable error codes returned by AuthService."""
     INVALID_CREDENTIALS = 'invalid_credentials'
     EMAIL_ALREADY_EXISTS = 'email_already_exists'
+    INVALID_EMAIL = 'invalid_email'
     WEAK_PASSWORD = 'weak_password'
 
 
-@dataclass
+@dataclass(slots=True)
 class AuthResult:
     """Outcome of an authentication or registration attempt."""
     success: bool
@@ -40,10 +75,35 @@ class AuthService:
         result = auth.login('user@example.com', 'p4$$word')
     """
 
+    # _COST and _DUMMY_HASH are class-wide (set by calibrate_cost), so they
+    # stay class attributes rather than slots.
+    __slots__ = ('_repo', '_verify_cache', '_verify_lock', '_pepper')
+
     MIN_PASSWORD_LENGTH = 8
 
+    # bcrypt cost for new hashes; see configure_cost(). The dummy check only
+    # hides unknown emails if it costs the same as a real verification, so
+    # hashes at any other cost are rehashed on the next successful login.
+    # 12 is the cost every existing hash was created with.
+    MIN_COST = 12
+    MAX_COST = 14
+    _COST = 12
+    _DUMMY_HASH = _make_dummy_hash(_COST)
+
+    # Successful verifications are remembered for a short while so repeat
+    # logins skip the bcrypt KDF. Failures are never cached, so guessing
+    # still pays full bcrypt cost per attempt.
+    VERIFY_CACHE_SIZE = 1024
+    VERIFY_CACHE_TTL = 300.0  # seconds
+
     def __init__(self, user_repository: UserRepository) -> None:
         self._repo = user_repository
+        # HMAC(pepper, hash || password) -> expiry. The per-process pepper
+        # means the keys are useless outside this process, and keying on
+        # the stored hash makes a password change invalidate old entries.
+        self._verify_cache: OrderedDict[bytes, float] = OrderedDict()
+        self._verify_lock = threading.Lock()
+        self._pepper = secrets.token_bytes(32)
 
     # ------------------------------------------------------------------ #
     # Public API                                                           #
@@ -61,6 +121,13 @@ class AuthService:
                 message='Email and password are required.',
             )
 
+        if not _EMAIL_FAST_CHECK(email):
+            return AuthResult(
+                success=False,
+                error=AuthError.INVALID_CREDENTIALS,
+                message='Invalid email or password.',
+            )
+
         user = self._repo.find_by_email(email)
         if user is None:
             # Perform a dummy hash check so the response time is constant
@@ -79,8 +146,16 @@ class AuthService:
                 message='Invalid email or password.',
             )
 
+        if self._hash_cost(user.password_hash) != self._COST:
+            self._repo.update_password(user.id, self._hash_password(password))
+
         return AuthResult(success=True, user=user)
 
+    async def login_async(self, email: str, password: str) -> AuthResult:
+        """``login`` for async callers; runs in the loop's default executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.login, email, password)
+
     def register(self, email: str, password: str) -> AuthResult:
         """Create a new user account.
 
@@ -93,6 +168,13 @@ class AuthService:
                 message='Email and password are required.',
             )
 
+        if not _EMAIL_FAST_CHECK(email):
+            return AuthResult(
+                success=False,
+                error=AuthError.INVALID_EMAIL,
+                message='Please enter a valid email address.',
+            )
+
         if len(password) < self.MIN_PASSWORD_LENGTH:
             return AuthResult(
                 success=False,
@@ -108,11 +190,17 @@ class AuthService:
             )
 
         hashed = self._hash_password(password)
-        user_id = self._repo.create(email, hashed)
-        user = self._repo.find_by_id(user_id)
+        with self._repo.unit_of_work():
+            user_id = self._repo.create(email, hashed)
+            user = self._repo.find_by_id(user_id)
 
         return AuthResult(success=True, user=user)
 
+    async def register_async(self, email: str, password: str) -> AuthResult:
+        """``register`` for async callers; runs in the loop's default executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.register, email, password)
+
     def change_password(self, user_id: int, current_password: str, new_password: str) -> AuthResult:
         """Change a user's password after verifying the current one."""
         user = self._repo.find_by_id(user_id)
@@ -139,6 +227,8 @@ class AuthService:
 
         hashed = self._hash_password(new_password)
         self._repo.update_password(user_id, hashed)
+        with self._verify_lock:
+            self._verify_cache.clear()
 
         return AuthResult(success=True, user=user)
 
@@ -146,25 +236,92 @@ class AuthService:
     # Password helpers                                                     #
     # ------------------------------------------------------------------ #
 
-    @staticmethod
-    def _hash_password(password: str) -> str:
-        """Hash a plain-text password with bcrypt (adaptive cost = 12)."""
-        salt = bcrypt.gensalt(rounds=12)
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    @classmethod
+    def configure_cost(cls, cost: int | None = None) -> int:
+        """Set the bcrypt cost for new hashes and the dummy check.
 
-    @staticmethod
-    def _verify_password(password: str, password_hash: str) -> bool:
-        """Check a plain-text password against a stored bcrypt hash."""
-        return bcrypt.checkpw(
-            password.encode('utf-8'),
-            password_hash.encode('utf-8'),
-        )
+        Defaults to the BCRYPT_COST environment variable, else MIN_COST.
+        Values outside [MIN_COST, MAX_COST] are clamped into it. Every
+        process sharing the users table must use the same value.
+
+        Raises ValueError if BCRYPT_COST is not an integer.
+        """
+        if cost is None:
+            raw = os.getenv('BCRYPT_COST', str(cls.MIN_COST))
+            try:
+                cost = int(raw)
+            except ValueError:
+                raise ValueError(f'BCRYPT_COST must be an integer, got {raw!r}') from None
+        clamped = min(max(cost, cls.MIN_COST), cls.MAX_COST)
+        if clamped != cost:
+            logger.warning(
+                'bcrypt cost %s is outside [%s, %s]; using %s',
+                cost, cls.MIN_COST, cls.MAX_COST, clamped,
+            )
+        cost = clamped
+        if cost != cls._COST:
+            cls._COST = cost
+            cls._DUMMY_HASH = _make_dummy_hash(cost)
+        return cost
+
+    @classmethod
+    def calibrate_cost(cls, target_ms: float = 250) -> int:
+        """Return the highest bcrypt cost whose hash fits in ``target_ms``.
+
+        Run it on the deployment hardware to choose BCRYPT_COST; it does
+        not change the cost in use. Never below MIN_COST.
+        """
+        cost = cls.MIN_COST
+        for rounds in range(cls.MIN_COST, cls.MAX_COST + 1):
+            start = time.perf_counter()
+            _hashpw(b'calibration', _gensalt(rounds=rounds))
+            if (time.perf_counter() - start) * 1000 > target_ms:
+                break
+            cost = rounds
+        return cost
 
     @staticmethod
-    def _dummy_check() -> None:
+    def _hash_cost(password_hash: str) -> int:
+        """Return the cost factor encoded in a bcrypt hash ($2b$<cost>$...)."""
+        return int(password_hash.split('$')[2])
+
+    @classmethod
+    def _hash_password(cls, password: str) -> str:
+        """Hash a plain-text password with bcrypt at the configured cost."""
+        salt = _gensalt(rounds=cls._COST)
+        return _hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    def _verify_password(self, password: str, password_hash: str) -> bool:
+        """Check a plain-text password against a stored bcrypt hash.
+
+        Recent successful checks are served from the verification cache.
+        """
+        key = hmac.new(
+            self._pepper,
+            password_hash.encode('utf-8') + b'\0' + password.encode('utf-8'),
+            hashlib.sha256,
+        ).digest()
+        now = time.monotonic()
+
+        with self._verify_lock:
+            expires = self._verify_cache.get(key)
+            if expires is not None:
+                if expires > now:
+                    self._verify_cache.move_to_end(key)
+                    return True
+                del self._verify_cache[key]
+
+        if not _checkpw(password.encode('utf-8'), password_hash.encode('utf-8')):
+            return False
+
+        with self._verify_lock:
+            self._verify_cache[key] = now + self.VERIFY_CACHE_TTL
+            self._verify_cache.move_to_end(key)
+            while len(self._verify_cache) > self.VERIFY_CACHE_SIZE:
+                self._verify_cache.popitem(last=False)
+        return True
+
+    @classmethod
+    def _dummy_check(cls) -> None:
         """Perform a throwaway bcrypt comparison to equalise timing."""
-        _dummy_hash = b'$2b$12$000000000000000000000000000000000000000000000000000000'
-        try:
-            bcrypt.checkpw(b'dummy', _dummy_hash)
-        except Exception:
-            pass
+        _checkpw(b'x' * 16, cls._DUMMY_HASH)
@@ -7,10 +7,16 @@ Stripe SDK (which expects plain strings) without calling .value.
 
 from __future__ import annotations
 
-from dataclasses import dataclass
 from enum import Enum
 
 
+# Currencies without minor units (no cents). See Stripe docs for full list.
+ZERO_DECIMAL_CURRENCIES = frozenset({
+    'bif', 'clp', 'djf', 'gnf', 'jpy', 'kmf', 'krw', 'mga', 'pyg',
+    'rwf', 'vnd', 'vuv', 'xaf', 'xof', 'xpf'
+})
+
+
 class RecurringInterval(str, Enum):
     """Billing intervals supported by Stripe."""
     DAY   = 'day'
@@ -18,8 +24,9 @@ class RecurringInterval(str, Enum):
     MONTH = 'month'
     YEAR  = 'year'
 
-    def __str__(self) -> str:
-        return self.value
+    # str's own C-level __str__ already yields the value; Enum's default
+    # would give 'RecurringInterval.MONTH'.
+    __str__ = str.__str__
 
 
 class Currency(str, Enum):
@@ -58,6 +65,10 @@ class Currency(str, Enum):
     VND = 'vnd'
     CLP = 'clp'
 
-    def __str__(self) -> str:
-        return self.value
+    __str__ = str.__str__
+
 
+# Precompute the flag per member so to_minor_unit needs no set lookup.
+for _currency in Currency:
+    _currency._is_zero_decimal = _currency.value in ZERO_DECIMAL_CURRENCIES
+del _currency
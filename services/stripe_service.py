@@ -6,17 +6,100 @@ in Flask, FastAPI, Django REST, or any other project type without
 modification.
 """
 
-from datetime import datetime
+import hashlib
+import hmac
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import ROUND_HALF_EVEN, Decimal, InvalidOperation
+from functools import lru_cache, partial
+from itertools import islice
+from typing import Iterator
+from urllib.parse import urlencode
+
+import requests
 import stripe
+import stripe.http_client
+from cachetools import LRUCache
+from cachetools.func import ttl_cache
 
-from .models import Currency, RecurringInterval
+from repositories.subscription_repository import SubscriptionRepository
 
+from .models import ZERO_DECIMAL_CURRENCIES, Currency, RecurringInterval
 
-# Currencies without minor units (no cents). See Stripe docs for full list.
-ZERO_DECIMAL_CURRENCIES = {
-    'bif', 'clp', 'djf', 'gnf', 'jpy', 'kmf', 'krw', 'mga', 'pyg',
-    'rwf', 'vnd', 'vuv', 'xaf', 'xof', 'xpf'
-}
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+_HUNDRED = Decimal(100)
+_ONE = Decimal(1)
+
+# Subscription items already embed their price; expanding the legacy
+# `plan` inlines the product as well. (`data.items.data.price.product`
+# would be five levels deep and Stripe rejects expansions beyond four.)
+_SUBSCRIPTION_EXPAND = ['data.plan.product']
+
+# Default cap on subscriptions listed per customer. Matches the Stripe page
+# size, so the common case costs a single round-trip.
+_ACTIVE_SUBSCRIPTION_CAP = 25
+
+# Maximum webhook signature age in seconds (same default as stripe.Webhook).
+_WEBHOOK_TOLERANCE = 300
+
+
+# Products are shared by every subscription that uses them and rarely
+# change, so cache them process-wide. The `product.updated` webhook clears
+# the cache early.
+@ttl_cache(maxsize=1024, ttl=3600)
+def _get_product(product_id: str) -> dict:
+    product = stripe.Product.retrieve(product_id)
+    return product.to_dict() if hasattr(product, 'to_dict') else dict(product)
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _utc(ts: int) -> datetime:
+    """Convert a Unix timestamp to a naive UTC datetime.
+
+    Plain epoch arithmetic: no local-timezone lookup, unlike
+    datetime.fromtimestamp. Naive to match the DATETIME columns.
+    """
+    return _EPOCH + timedelta(seconds=ts)
+
+
+@lru_cache(maxsize=4096)
+def _iso(ts: int) -> str:
+    """Format a Unix timestamp as a (naive) UTC ISO-8601 string.
+
+    Period ends repeat across renders, so results are memoised.
+    """
+    return _utc(ts).isoformat()
+
+
+# Checkout prices keyed by (product_name, unit_amount, currency, interval),
+# so repeat checkouts for the same plan reuse one Price instead of creating
+# a new one each time. Cleared by the price/product webhooks.
+_CHECKOUT_PRICES: LRUCache = LRUCache(maxsize=1024)
+_CHECKOUT_PRICES_LOCK = threading.Lock()
+
+
+def _is_zero_decimal(currency: Currency | str | None) -> bool:
+    """Return True if the currency has no minor unit."""
+    # Currency members carry the flag; only raw strings need a lookup.
+    if isinstance(currency, Currency):
+        return currency._is_zero_decimal
+    return bool(currency) and currency.lower() in ZERO_DECIMAL_CURRENCIES
+
+
+def _search_quote(value: str) -> str:
+    """Escape a value for use inside a double-quoted Search API term."""
+    return value.replace('\\', '\\\\').replace('"', '\\"')
 
 
 class StripeService:
@@ -27,11 +110,44 @@ class StripeService:
             publishable_key="pk_test_...",
             webhook_secret="whsec_...",
         )
+
+    Pass a ``subscription_repository`` to have the webhook handlers keep a
+    local copy of each user's subscriptions up to date. Call ``close()`` on
+    shutdown to stop the service's worker threads.
     """
-    def __init__(self, secret_key: str, publishable_key: str, webhook_secret: str = None):
+    def __init__(
+        self,
+        secret_key: str,
+        publishable_key: str,
+        webhook_secret: str = None,
+        subscription_repository: SubscriptionRepository | None = None,
+    ):
         self.publishable_key = publishable_key
         self.webhook_secret = webhook_secret
+        self._webhook_secret_bytes = webhook_secret.encode('utf-8') if webhook_secret else None
+        self._subscriptions = subscription_repository
         stripe.api_key = secret_key
+        stripe.default_http_client = self._build_http_client()
+
+        # Bounded pool for concurrent per-customer list calls. Writes such as
+        # checkout creation run on the request thread and never queue here.
+        self._list_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='stripe-list')
+
+    def close(self) -> None:
+        """Wait for in-flight Stripe calls and stop the worker pool."""
+        self._list_pool.shutdown(wait=True)
+
+    @staticmethod
+    def _build_http_client() -> stripe.http_client.RequestsClient:
+        """Return a Stripe HTTP client backed by one keep-alive session.
+
+        Every Stripe call (including the fan-out pool threads) reuses pooled
+        TLS connections to api.stripe.com instead of handshaking per call.
+        """
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32)
+        session.mount('https://', adapter)
+        return stripe.http_client.RequestsClient(timeout=30, session=session)
 
     def get_invoice_pdf_url(self, invoice_id: str) -> str | None:
         """Return the hosted invoice PDF URL for a given invoice ID."""
@@ -39,17 +155,19 @@ class StripeService:
             invoice = stripe.Invoice.retrieve(invoice_id)
             return invoice.invoice_pdf if hasattr(invoice, 'invoice_pdf') else invoice.get('invoice_pdf')
         except Exception as exc:
-            print(f'[StripeService] Error retrieving invoice PDF for {invoice_id}: {exc}')
+            logger.warning('Error retrieving invoice PDF for %s: %s', invoice_id, exc)
             return None
 
     def cancel_subscription(self, subscription_id: str) -> dict | None:
         """Cancel a Stripe subscription by its ID."""
         try:
             canceled = stripe.Subscription.delete(subscription_id)
-            print(f'[StripeService] Subscription canceled: {canceled.id}')
+            logger.info('Subscription canceled: %s', canceled.id)
+            if self._subscriptions is not None:
+                self._subscriptions.update_status(canceled.id, canceled.status)
             return canceled.to_dict() if hasattr(canceled, 'to_dict') else dict(canceled)
         except Exception as exc:
-            print(f'[StripeService] Error canceling subscription {subscription_id}: {exc}')
+            logger.warning('Error canceling subscription %s: %s', subscription_id, exc)
             return None
 
     # ------------------------------------------------------------------ #
@@ -63,32 +181,42 @@ class StripeService:
         Examples:
             12.34 USD -> 1234
             1000 JPY -> 1000  (JPY has no minor unit)
+            2.675 USD -> 268  (decimal arithmetic, no float drift)
         """
         try:
-            amt = float(amount_major)
-        except (TypeError, ValueError):
+            amt = Decimal(str(amount_major))
+            if not _is_zero_decimal(currency):
+                amt *= _HUNDRED
+            return int(amt.quantize(_ONE, rounding=ROUND_HALF_EVEN))
+        except (InvalidOperation, TypeError, ValueError):
             return None
 
-        if currency and currency.lower() in ZERO_DECIMAL_CURRENCIES:
-            return int(round(amt))
+    @staticmethod
+    def to_major_unit(amount_minor: int, currency: str) -> Decimal:
+        """Convert a minor-unit amount back to major units (inverse of to_minor_unit).
 
-        return int(round(amt * 100))
+        Examples:
+            1234 USD -> Decimal('12.34')
+            1000 JPY -> Decimal('1000')
+        """
+        amt = Decimal(amount_minor)
+        return amt if _is_zero_decimal(currency) else amt.scaleb(-2)
 
     @staticmethod
     def _extract_list_data(obj) -> list:
         """Safely extract `.data` items from Stripe list-like responses."""
-        if obj is None:
+        # Stripe ListObjects are by far the common case: one lookup for them.
+        data = getattr(obj, 'data', _MISSING)
+        if data is not _MISSING:
+            return data or []
+        if obj is None or isinstance(obj, (str, bytes)):
             return []
-        if hasattr(obj, 'data'):
-            return obj.data or []
-        if isinstance(obj, dict) and 'data' in obj:
+        if isinstance(obj, dict):
             return obj.get('data') or []
         try:
-            if hasattr(obj, '__iter__') and not isinstance(obj, (str, bytes, dict)):
-                return list(obj)
-        except Exception:
-            pass
-        return []
+            return list(obj)
+        except TypeError:
+            return []
 
     # ------------------------------------------------------------------ #
     # Customers                                                            #
@@ -98,8 +226,12 @@ class StripeService:
         """Return a Stripe customer ID for the given email.
 
         Creates a new customer if none exists for this email.
-        Returns the customer ID, or None on failure.
+        Returns the customer ID, or None on failure or an empty email.
         """
+        # Stripe drops an empty `email` filter, which would match an
+        # arbitrary customer; bail out before touching the network.
+        if not email:
+            return None
         try:
             existing = stripe.Customer.list(email=email, limit=1)
             existing_list = self._extract_list_data(existing)
@@ -108,75 +240,183 @@ class StripeService:
             new_customer = stripe.Customer.create(email=email)
             return getattr(new_customer, 'id', None)
         except Exception as exc:
-            print(f'[StripeService] Error in get_or_create_customer for {email}: {exc}')
+            logger.warning('Error in get_or_create_customer for %s: %s', email, exc)
             return None
 
     # ------------------------------------------------------------------ #
     # Subscriptions                                                        #
     # ------------------------------------------------------------------ #
 
-    def get_subscriptions_for_user(self, user_email: str, full: bool = False) -> tuple[list, list]:
+    def get_subscriptions_for_user(
+        self,
+        user_email: str,
+        full: bool = False,
+        include_all: bool = False,
+        fresh: bool = False,
+    ) -> tuple[list[dict], list]:
         """Return (subscriptions, queried_customer_ids) for a given email.
 
+        Collects `iter_subscriptions_for_user` into a list; see there for
+        the meaning of the arguments.
+        """
+        queried_customer_ids = []
+        subscriptions = list(self.iter_subscriptions_for_user(
+            user_email, full, include_all, queried_customer_ids, fresh,
+        ))
+        return subscriptions, queried_customer_ids
+
+    def iter_subscriptions_for_user(
+        self,
+        user_email: str,
+        full: bool = False,
+        include_all: bool = False,
+        queried_customer_ids: list | None = None,
+        fresh: bool = False,
+    ) -> Iterator[dict]:
+        """Yield the subscriptions for a given email as Stripe returns them.
+
+        By default only `active` subscriptions are listed, at most 25 per
+        Stripe query (one page). Pass `include_all=True` to page through
+        every subscription regardless of status.
+
+        Subscriptions created through `create_checkout_session` carry the
+        user's email in their metadata, so a single Search API call finds
+        them. If that search fails or matches nothing (e.g. subscriptions
+        that predate the metadata and have not been backfilled), the user's
+        Stripe customers are looked up by email instead; only that path
+        appends their ids to `queried_customer_ids`, when given.
+
+        Search results lag writes by up to a minute, so a subscription
+        created moments ago can be missing from a non-empty search. Pass
+        `fresh=True` (explicit refreshes) to skip the search and always
+        list the customers' subscriptions, which is read-after-write
+        consistent.
+
+        Nothing is fetched until the generator is consumed. Search results,
+        and the subscriptions of the last (usually only) customer listed,
+        are yielded page by page as they arrive; any other customers are
+        prefetched concurrently and yielded after them.
+
         When `full=False` (default) each item is a lightweight summary dict.
         When `full=True` the raw Stripe subscription dicts are returned.
         """
-        subscriptions: list = []
-        queried_customer_ids: list = []
-
         if not user_email:
-            return subscriptions, queried_customer_ids
+            return
+
+        if not fresh:
+            found = self._search_subs_by_email(user_email, full, include_all)
+            if found is not None:
+                yield from found
+                return
 
         customers = stripe.Customer.list(email=user_email, limit=100)
         # customers = stripe.Customer.list(email=user_email, test_clock='clock_1T6a7YFQa34ZXDyiUME83ULN', limit=100)
-        print(f"[DEBUG] Stripe customers for email '{user_email}': {customers}")
+        logger.debug("Stripe customers for email '%s': %s", user_email, customers)
         customers_list = self._extract_list_data(customers)
-        queried_customer_ids = [getattr(c, 'id', None) for c in customers_list]
-
-        for customer in customers_list:
-            subs = stripe.Subscription.list(customer=customer.id, limit=100)
-            subs_iter = (
-                subs.auto_paging_iter()
-                if hasattr(subs, 'auto_paging_iter')
-                else self._extract_list_data(subs)
-            )
+        customer_ids = [getattr(c, 'id', None) for c in customers_list]
+        if queried_customer_ids is not None:
+            queried_customer_ids.extend(customer_ids)
 
-            for s in subs_iter:
-                if full:
-                    subscriptions.append(self._full_subscription(s))
-                else:
-                    subscriptions.append(self._summary_subscription(s))
+        yield from self._iter_subscriptions(customer_ids, full, include_all)
 
-        return subscriptions, queried_customer_ids
+    def _search_subs_by_email(self, user_email: str, full: bool, include_all: bool) -> Iterator[dict] | None:
+        """Search subscriptions by their `user_email` metadata.
+
+        Returns a lazy iterator of formatted subscriptions, or None when the
+        search fails or its first page is empty.
+        """
+        query = f'metadata["user_email"]:"{_search_quote(user_email)}"'
+        if not include_all:
+            query += ' AND status:"active"'
+        params = {'query': query, 'limit': 100 if include_all else _ACTIVE_SUBSCRIPTION_CAP}
+        if not full:
+            params['expand'] = _SUBSCRIPTION_EXPAND
 
-    def _full_subscription(self, s) -> dict:
-        """Return the full Stripe subscription as a dict."""
         try:
-            if hasattr(s, 'to_dict'):
-                return s.to_dict()
-            sub_id = getattr(s, 'id', s)
-            try:
-                retrieved = stripe.Subscription.retrieve(sub_id)
-                return retrieved.to_dict() if hasattr(retrieved, 'to_dict') else dict(retrieved)
-            except stripe.error.InvalidRequestError as ire:
-                print(f'[StripeService] InvalidRequestError retrieving subscription {sub_id}: {ire}')
-                try:
-                    retrieved = stripe.Subscription.retrieve(sub_id, expand=[])
-                    return retrieved.to_dict() if hasattr(retrieved, 'to_dict') else dict(retrieved)
-                except Exception:
-                    pass
-        except Exception:
-            pass
+            result = stripe.Subscription.search(**params)
+        except stripe.error.StripeError as exc:
+            logger.warning('Subscription metadata search failed for %s: %s', user_email, exc)
+            return None
+        if not self._extract_list_data(result):
+            return None
+
+        subs_iter = (
+            result.auto_paging_iter()
+            if hasattr(result, 'auto_paging_iter')
+            else self._extract_list_data(result)
+        )
+        if not include_all:
+            subs_iter = islice(subs_iter, _ACTIVE_SUBSCRIPTION_CAP)
+        format_one = self._full_subscription if full else self._summary_subscription
+        return (format_one(s) for s in subs_iter)
+
+    def _iter_subscriptions(self, customer_ids: list, full: bool, include_all: bool) -> Iterator[dict]:
+        """Yield the formatted subscriptions of the given customers.
+
+        All but the last customer are fetched whole on the list pool. The
+        calling thread pages through the last one itself and yields each page
+        as it arrives, then the prefetched ones. A single customer (the common
+        case) never touches the pool and is streamed throughout.
+        """
+        if not customer_ids:
+            return
+
+        collect = partial(self._collect_subs_for_customer, full=full, include_all=include_all)
+        futures = [self._list_pool.submit(collect, cid) for cid in customer_ids[:-1]]
+        try:
+            yield from self._subs_for_customer(customer_ids[-1], full, include_all)
+            for f in futures:
+                yield from f.result()
+        finally:
+            # The consumer may stop early (e.g. the client went away).
+            for f in futures:
+                f.cancel()
+
+    def _subs_for_customer(self, customer_id: str, full: bool, include_all: bool = False) -> Iterator[dict]:
+        """Yield the formatted subscriptions of a single Stripe customer.
+
+        Pages are requested lazily, as the iterator is consumed.
+        """
+        params = {'customer': customer_id}
+        if include_all:
+            # The list endpoint omits canceled subscriptions unless asked.
+            params.update(status='all', limit=100)
+        else:
+            params.update(status='active', limit=_ACTIVE_SUBSCRIPTION_CAP)
+        if not full:
+            params['expand'] = _SUBSCRIPTION_EXPAND
+
+        subs = stripe.Subscription.list(**params)
+        subs_iter = (
+            subs.auto_paging_iter()
+            if hasattr(subs, 'auto_paging_iter')
+            else self._extract_list_data(subs)
+        )
+        if not include_all:
+            subs_iter = islice(subs_iter, _ACTIVE_SUBSCRIPTION_CAP)
+        format_one = self._full_subscription if full else self._summary_subscription
+        for s in subs_iter:
+            yield format_one(s)
+
+    def _collect_subs_for_customer(self, customer_id: str, full: bool, include_all: bool = False) -> list:
+        """Return `_subs_for_customer` as a list, for prefetching on the pool."""
+        return list(self._subs_for_customer(customer_id, full, include_all))
 
+    def _full_subscription(self, s) -> dict:
+        """Return the full Stripe subscription as a dict."""
+        if hasattr(s, 'to_dict'):
+            return s.to_dict()
         return {
             'id': getattr(s, 'id', None),
             'status': getattr(s, 'status', None),
             'current_period_end': getattr(s, 'current_period_end', None),
         }
 
-    def _summary_subscription(self, s) -> dict:
+    def _summary_subscription(self, s, include_invoices: bool = True) -> dict:
         """Return a lightweight subscription summary dict for UI display."""
-        items_list = self._extract_list_data(getattr(s, 'items', None))
+        # Stripe objects are dicts, so `s.items` is dict.items; index instead.
+        items = s.get('items') if isinstance(s, dict) else getattr(s, 'items', None)
+        items_list = self._extract_list_data(items)
         item = items_list[0] if items_list else None
 
         price_obj = None
@@ -184,14 +424,6 @@ class StripeService:
             price = item.get('price') if isinstance(item, dict) else getattr(item, 'price', None)
             if isinstance(price, dict):
                 price_obj = price
-            elif price:
-                try:
-                    p = stripe.Price.retrieve(price)
-                    price_obj = p.to_dict() if hasattr(p, 'to_dict') else dict(p)
-                except stripe.error.InvalidRequestError as ire:
-                    print(f'[StripeService] InvalidRequestError retrieving price {price}: {ire}')
-                except Exception:
-                    pass
 
         product_name = None
         if price_obj:
@@ -200,15 +432,18 @@ class StripeService:
                 if isinstance(price_obj, dict)
                 else getattr(price_obj, 'product', None)
             )
+            if not isinstance(prod, dict):
+                plan = s.get('plan') if isinstance(s, dict) else None
+                plan_prod = plan.get('product') if isinstance(plan, dict) else None
+                if isinstance(plan_prod, dict) and plan_prod.get('id') == prod:
+                    prod = plan_prod
             if isinstance(prod, dict):
                 product_name = prod.get('name')
             elif prod:
                 try:
-                    prod_obj = stripe.Product.retrieve(prod)
-                    prod_dict = prod_obj.to_dict() if hasattr(prod_obj, 'to_dict') else dict(prod_obj)
-                    product_name = prod_dict.get('name')
+                    product_name = _get_product(prod).get('name')
                 except stripe.error.InvalidRequestError as ire:
-                    print(f'[StripeService] InvalidRequestError retrieving product {prod}: {ire}')
+                    logger.warning('InvalidRequestError retrieving product %s: %s', prod, ire)
                 except Exception:
                     pass
 
@@ -216,31 +451,115 @@ class StripeService:
         # Get invoices for this subscription
         invoices = []
         sub_id = getattr(s, 'id', None)
-        if sub_id:
+        if sub_id and include_invoices:
             try:
                 invoice_objs = stripe.Invoice.list(subscription=sub_id, limit=10)
-                for inv in self._extract_list_data(invoice_objs):
-                    invoices.append({
-                        'id': inv.id,
-                        'status': inv.status,
-                        'amount_paid': getattr(inv, 'amount_paid', None),
-                        'currency': getattr(inv, 'currency', None),
-                        'pdf_url': getattr(inv, 'invoice_pdf', None)
-                    })
+                invoices = [
+                    self._invoice_summary(inv) for inv in self._extract_list_data(invoice_objs)
+                ]
             except Exception as exc:
-                print(f'[StripeService] Error fetching invoices for subscription {sub_id}: {exc}')
+                logger.warning('Error fetching invoices for subscription %s: %s', sub_id, exc)
         return {
             'id': sub_id,
             'status': getattr(s, 'status', None),
-            'current_period_end': datetime.fromtimestamp(period_end).isoformat() if period_end else None,
+            'current_period_end': _iso(period_end) if period_end else None,
             'product_name': product_name,
             'amount': (price_obj.get('unit_amount') / 100) if price_obj and price_obj.get('unit_amount') else None,
             'currency': price_obj.get('currency') if price_obj else None,
             'interval': price_obj.get('recurring', {}).get('interval') if price_obj else None,
+            'created': getattr(s, 'created', None),
             'can_cancel': getattr(s, 'status', None) in ['active', 'trialing'],
             'invoices': invoices
         }
 
+    @staticmethod
+    def _invoice_summary(inv) -> dict:
+        """Return the invoice fields shown on the dashboard."""
+        return {
+            'id': inv.get('id'),
+            'status': inv.get('status'),
+            'amount_paid': inv.get('amount_paid'),
+            'currency': inv.get('currency'),
+            'pdf_url': inv.get('invoice_pdf'),
+            'created': inv.get('created'),
+        }
+
+    def store_subscriptions(self, user_email: str, summaries: list) -> None:
+        """Save a user's active subscriptions, as just listed, to the local index.
+
+        Rows still stored as active but missing from ``summaries`` (e.g. a
+        missed cancellation webhook) get their status re-read from Stripe.
+        Also marks the email as synced, so it is served from the index from
+        now on even when it has no subscriptions. No-op when the service
+        was created without a subscription repository.
+        """
+        if self._subscriptions is None:
+            return
+        for summary in summaries:
+            self._store_summary(user_email, summary)
+        listed = {summary['id'] for summary in summaries}
+        for sub_id in self._subscriptions.find_active_ids_by_email(user_email) - listed:
+            self._resync_status(sub_id)
+        self._subscriptions.mark_synced(user_email)
+
+    def _resync_status(self, subscription_id: str) -> None:
+        """Overwrite a stored subscription's status with Stripe's current one."""
+        try:
+            s = stripe.Subscription.retrieve(subscription_id)
+        except stripe.error.InvalidRequestError:
+            # No longer exists in Stripe.
+            self._subscriptions.update_status(subscription_id, 'canceled')
+            return
+        except stripe.error.StripeError as exc:
+            logger.warning('Could not re-read subscription %s: %s', subscription_id, exc)
+            return
+        period_end = s.get('current_period_end')
+        self._subscriptions.update_status(
+            subscription_id, s.get('status'), _utc(period_end) if period_end else None,
+        )
+
+    def _store_summary(self, user_email: str, summary: dict) -> None:
+        period_end = summary.get('current_period_end')
+        self._subscriptions.upsert(
+            user_email=user_email,
+            subscription_id=summary['id'],
+            status=summary['status'],
+            current_period_end=datetime.fromisoformat(period_end) if period_end else None,
+            product_name=summary.get('product_name'),
+            amount=summary.get('amount'),
+            currency=summary.get('currency'),
+            interval=summary.get('interval'),
+            created=summary.get('created'),
+        )
+        self._subscriptions.upsert_invoices(summary['id'], summary.get('invoices') or [])
+
+    def _store_invoice(self, invoice) -> None:
+        """Save a webhook invoice to the local index (subscription invoices only)."""
+        sub_id = invoice.get('subscription')
+        if self._subscriptions is not None and sub_id:
+            self._subscriptions.upsert_invoices(sub_id, [self._invoice_summary(invoice)])
+
+    def backfill_subscription_metadata(self) -> int:
+        """Stamp `user_email` metadata on existing subscriptions that lack it.
+
+        Walks every customer that has an email and tags their subscriptions
+        so the metadata search in `iter_subscriptions_for_user` can find them.
+        Returns the number of subscriptions updated.
+        """
+        updated = 0
+        for customer in stripe.Customer.list(limit=100).auto_paging_iter():
+            email = customer.get('email')
+            if not email:
+                continue
+            subs = stripe.Subscription.list(customer=customer.id, status='all', limit=100)
+            for sub in subs.auto_paging_iter():
+                if (sub.get('metadata') or {}).get('user_email'):
+                    continue
+                stripe.Subscription.modify(sub.id, metadata={'user_email': email})
+                updated += 1
+                logger.info('Tagged subscription %s with user_email=%s', sub.id, email)
+        return updated
+
     # ------------------------------------------------------------------ #
     # Checkout                                                             #
     # ------------------------------------------------------------------ #
@@ -255,7 +574,12 @@ class StripeService:
         success_url: str,
         cancel_url: str,
     ) -> dict:
-        """Create a Stripe Checkout Session and return {'url': ..., 'sessionId': ...}.
+        """Create a Stripe Checkout Session.
+
+        Returns {'url': ..., 'sessionId': ...}. The amount charged (rounded
+        to the currency's minor unit) and the currency are appended to
+        ``success_url`` as ``amount`` and ``currency`` query parameters, so
+        the success page can render without calling Stripe.
 
         Raises ValueError for invalid amounts.
         Raises stripe.error.StripeError on Stripe API errors.
@@ -264,6 +588,18 @@ class StripeService:
         if amount_minor is None or amount_minor <= 0:
             raise ValueError('Invalid amount')
 
+        # Work with plain interned strings from here on, so enum members and
+        # raw strings share one price-cache key and Stripe gets plain str.
+        currency = sys.intern(currency.value if isinstance(currency, Currency) else currency.lower())
+        if isinstance(recurring_interval, RecurringInterval):
+            recurring_interval = recurring_interval.value
+
+        success_url += '&' if '?' in success_url else '?'
+        success_url += urlencode({
+            'amount': str(self.to_major_unit(amount_minor, currency)),
+            'currency': currency.upper(),
+        })
+
         price_data = {
             'currency': currency,
             'unit_amount': amount_minor,
@@ -273,13 +609,19 @@ class StripeService:
             price_data['recurring'] = {'interval': recurring_interval}
 
         mode = 'subscription' if recurring_interval else 'payment'
-        price = stripe.Price.create(**price_data)
+        price_key = (product_name, amount_minor, currency, recurring_interval)
+        with _CHECKOUT_PRICES_LOCK:
+            price_id = _CHECKOUT_PRICES.get(price_key)
+        if price_id is None:
+            price_id = stripe.Price.create(**price_data).id
+            with _CHECKOUT_PRICES_LOCK:
+                _CHECKOUT_PRICES[price_key] = price_id
 
-        customer_id = self.get_or_create_customer(email) if email else None
+        customer_id = self.get_or_create_customer(email)
 
         session_data = {
             'mode': mode,
-            'line_items': [{'price': price.id, 'quantity': 1}],
+            'line_items': [{'price': price_id, 'quantity': 1}],
             'payment_method_types': ['card'],
             'billing_address_collection': 'required',
             'locale': 'auto',
@@ -296,10 +638,16 @@ class StripeService:
         # submit_type is only valid for one-time payments
         if mode == 'payment':
             session_data['submit_type'] = 'pay'
+        elif email:
+            # Lets iter_subscriptions_for_user find it with one metadata search.
+            session_data['subscription_data'] = {'metadata': {'user_email': email}}
 
         checkout_session = stripe.checkout.Session.create(**session_data)
-        print(f'[StripeService] Created checkout session: {checkout_session.id} for {email}')
-        return {'url': checkout_session.url, 'sessionId': checkout_session.id}
+        logger.info('Created checkout session: %s for %s', checkout_session.id, email)
+        return {
+            'url': checkout_session.url,
+            'sessionId': checkout_session.id,
+        }
 
     # ------------------------------------------------------------------ #
     # Success page data                                                    #
@@ -311,16 +659,17 @@ class StripeService:
         Returns {'amount': float | None, 'currency': str | None}.
         """
         try:
-            stripe.checkout.Session.retrieve(session_id)
-            line_items = stripe.checkout.Session.list_line_items(session_id)
+            # Line items carry their full price object, so this is the only
+            # call needed.
+            line_items = stripe.checkout.Session.list_line_items(session_id, limit=1)
             if line_items.data:
-                price_obj = stripe.Price.retrieve(line_items.data[0].price.id)
+                price_obj = line_items.data[0].price
                 return {
-                    'amount': price_obj.unit_amount / 100,
-                    'currency': price_obj.currency.upper(),
+                    'amount': price_obj['unit_amount'] / 100,
+                    'currency': price_obj['currency'].upper(),
                 }
         except Exception as exc:
-            print(f'[StripeService] Error fetching session {session_id}: {exc}')
+            logger.warning('Error fetching session %s: %s', session_id, exc)
 
         return {'amount': None, 'currency': None}
 
@@ -335,75 +684,134 @@ class StripeService:
         Raises ValueError for invalid payload.
         Raises stripe.error.SignatureVerificationError for invalid signature.
         """
-        return stripe.Webhook.construct_event(payload, sig_header, self.webhook_secret)
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        self._verify_webhook_signature(payload, sig_header)
+        return stripe.Event.construct_from(json.loads(payload), stripe.api_key)
+
+    def _verify_webhook_signature(self, payload: bytes, sig_header: str) -> None:
+        """Check the `Stripe-Signature` header the same way stripe.Webhook does.
+
+        The HMAC key is encoded once at construction instead of per event.
+        """
+        if self._webhook_secret_bytes is None:
+            raise stripe.error.SignatureVerificationError(
+                'Webhook secret is not configured', sig_header, payload)
+
+        timestamp = None
+        signatures = []
+        for part in (sig_header or '').split(','):
+            key, _, value = part.strip().partition('=')
+            if key == 't':
+                timestamp = value
+            elif key == 'v1':
+                signatures.append(value.encode('utf-8'))
+
+        if not timestamp or not timestamp.isdigit() or not signatures:
+            raise stripe.error.SignatureVerificationError(
+                'Unable to extract timestamp and signatures from header', sig_header, payload)
+
+        expected = hmac.new(
+            self._webhook_secret_bytes,
+            timestamp.encode('ascii') + b'.' + payload,
+            hashlib.sha256,
+        ).hexdigest().encode('ascii')
+        if not any(hmac.compare_digest(expected, sig) for sig in signatures):
+            raise stripe.error.SignatureVerificationError(
+                'No signatures found matching the expected signature for payload', sig_header, payload)
+
+        if int(timestamp) < time.time() - _WEBHOOK_TOLERANCE:
+            raise stripe.error.SignatureVerificationError(
+                'Timestamp outside the tolerance zone', sig_header, payload)
 
     # ------------------------------------------------------------------ #
     # Webhook event handlers                                             #
     # ------------------------------------------------------------------ #
 
+    # Event type -> handler method name. Built once; resolved per event.
+    _HANDLER_TABLE = {
+        'checkout.session.completed': '_on_checkout_session_completed',
+        'customer.subscription.updated': '_on_subscription_updated',
+        'customer.subscription.deleted': '_on_subscription_deleted',
+        'invoice.payment_succeeded': '_on_invoice_payment_succeeded',
+        'invoice.payment_failed': '_on_invoice_payment_failed',
+        'price.updated': '_on_price_updated',
+        'product.updated': '_on_product_updated',
+    }
+
     def handle_webhook_event(self, event) -> bool:
         """Dispatch a verified webhook event to the appropriate handler.
 
         Returns True if the event type was handled, False if unrecognised.
         """
-        handlers = {
-            'checkout.session.completed': self._on_checkout_session_completed,
-            'customer.subscription.updated': self._on_subscription_updated,
-            'customer.subscription.deleted': self._on_subscription_deleted,
-            'invoice.payment_succeeded': self._on_invoice_payment_succeeded,
-            'invoice.payment_failed': self._on_invoice_payment_failed,
-        }
-        handler = handlers.get(event['type'])
-        if handler:
-            handler(event)
+        name = self._HANDLER_TABLE.get(event['type'])
+        if name:
+            getattr(self, name)(event)
             return True
-        print(f'[StripeService] Unhandled event type: {event["type"]}')
+        logger.debug('Unhandled event type: %s', event['type'])
         return False
 
     def _on_checkout_session_completed(self, event):
         session_obj = event['data']['object']
-        print('=== STRIPE HANDLER CHECKOUT COMPLETED ===')
-        print(f'Session ID: {session_obj["id"]}')
-        print(f'Subscription ID: {session_obj.get("subscription")}')
-        print(f'Customer Email: {session_obj.get("customer_email")}')
-        print('=========================================')
-        # TODO: Store this relationship in your database
+        logger.info(
+            'checkout.session.completed id=%s subscription=%s email=%s',
+            session_obj['id'], session_obj.get('subscription'), session_obj.get('customer_email'),
+        )
+        sub_id = session_obj.get('subscription')
+        email = session_obj.get('customer_email') or (session_obj.get('customer_details') or {}).get('email')
+        if self._subscriptions is not None and sub_id and email:
+            s = stripe.Subscription.retrieve(sub_id, expand=['plan.product'])
+            self._store_summary(email, self._summary_subscription(s, include_invoices=False))
 
     def _on_subscription_updated(self, event):
         subscription = event['data']['object']
-        print('=== STRIPE HANDLER SUBSCRIPTION UPDATED ===')
-        print(f'Subscription ID: {subscription["id"]}')
-        print(f'Customer ID: {subscription["customer"]}')
-        print(f'Status: {subscription["status"]}')
-        print('============================================')
-        # TODO: Update subscription status in your database
+        logger.info(
+            'customer.subscription.updated id=%s customer=%s status=%s',
+            subscription['id'], subscription['customer'], subscription['status'],
+        )
+        if self._subscriptions is not None:
+            period_end = subscription.get('current_period_end')
+            self._subscriptions.update_status(
+                subscription['id'],
+                subscription['status'],
+                _utc(period_end) if period_end else None,
+            )
 
     def _on_subscription_deleted(self, event):
         subscription = event['data']['object']
-        print('=== STRIPE HANDLER SUBSCRIPTION DELETED ===')
-        print(f'Subscription ID: {subscription["id"]}')
-        print(f'Customer ID: {subscription["customer"]}')
-        print(f'Action: Mark subscription as canceled, revoke access')
-        print('============================================')
-        # TODO: Mark subscription as canceled in your database, disable access
+        logger.info(
+            'customer.subscription.deleted id=%s customer=%s',
+            subscription['id'], subscription['customer'],
+        )
+        if self._subscriptions is not None:
+            self._subscriptions.update_status(subscription['id'], 'canceled')
 
     def _on_invoice_payment_succeeded(self, event):
         invoice = event['data']['object']
-        print('=== STRIPE HANDLER INVOICE PAYMENT SUCCEEDED ===')
-        print(f'Invoice ID: {invoice["id"]}')
-        print(f'Subscription ID: {invoice.get("subscription")}')
-        print(f'Customer ID: {invoice["customer"]}')
-        print(f'Amount: {invoice["amount_paid"]} {invoice["currency"].upper()}')
-        print('================================================')
-        # TODO: Log successful recurring payment in your database
+        logger.info(
+            'invoice.payment_succeeded id=%s subscription=%s customer=%s amount=%s currency=%s',
+            invoice['id'], invoice.get('subscription'), invoice['customer'],
+            invoice['amount_paid'], invoice['currency'],
+        )
+        self._store_invoice(invoice)
 
     def _on_invoice_payment_failed(self, event):
         invoice = event['data']['object']
-        print('=== STRIPE HANDLER INVOICE PAYMENT FAILED ===')
-        print(f'Invoice ID: {invoice["id"]}')
-        print(f'Subscription ID: {invoice.get("subscription")}')
-        print(f'Customer ID: {invoice["customer"]}')
-        print(f'Amount Due: {invoice["amount_due"]} {invoice["currency"].upper()}')
-        print(f'Action: Alert user, consider disabling access')
-        print('==============================================')
-        # TODO: Log failed payment, optionally disable access
+        logger.info(
+            'invoice.payment_failed id=%s subscription=%s customer=%s amount_due=%s currency=%s',
+            invoice['id'], invoice.get('subscription'), invoice['customer'],
+            invoice['amount_due'], invoice['currency'],
+        )
+        self._store_invoice(invoice)
+        # TODO: Optionally disable access
+
+    def _on_price_updated(self, event):
+        logger.info('Price updated: %s, clearing checkout price cache', event['data']['object']['id'])
+        with _CHECKOUT_PRICES_LOCK:
+            _CHECKOUT_PRICES.clear()
+
+    def _on_product_updated(self, event):
+        logger.info('Product updated: %s, clearing product caches', event['data']['object']['id'])
+        _get_product.cache_clear()
+        with _CHECKOUT_PRICES_LOCK:
+            _CHECKOUT_PRICES.clear()